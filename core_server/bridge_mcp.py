@@ -16,17 +16,16 @@ MQTT <-> MCP Bridge (웹 인터페이스 제거, MCP SSE 전용)
       - bridge://projections
 - SSE endpoint for MCP: /sse (포트 8083)
 """
-import os, sys, json, time, uuid, threading, queue, requests, logging, socket, base64, io
+import os, sys, json, time, uuid, threading, queue, requests, logging, socket, base64, asyncio
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional, List, Union
-from pathlib import Path
 
 # FastMCP and MCP types
-from mcp.server.fastmcp import FastMCP, Context
+from mcp.server.fastmcp import FastMCP
 from mcp.types import ImageContent, TextContent, Resource
 
 # Pydantic for dynamic model creation
-from pydantic import create_model, BaseModel
+from pydantic import create_model
 
 # ---- STDERR-only logging (STDIO-safe)
 logging.basicConfig(level=logging.INFO, stream=sys.stderr)
@@ -49,6 +48,17 @@ def now_iso() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 # ========= Tool Projection Layer =========
+def default_projection_config() -> Dict[str, Any]:
+    """기본 projection 설정 (호출마다 새 dict - 호출자가 수정해도 안전)"""
+    return {
+        "devices": {},
+        "global": {
+            "auto_enable_new_devices": True,
+            "auto_enable_new_tools": True,
+            "auto_enable_new_events": False  # EVENT는 기본 숨김
+        }
+    }
+
 class ToolProjectionStore:
     def __init__(self, config_path: str):
         self.config_path = config_path
@@ -59,40 +69,33 @@ class ToolProjectionStore:
     def load_config(self):
         """Load projection configuration from JSON file"""
         try:
-            if Path(self.config_path).exists():
-                with open(self.config_path, 'r') as f:
-                    self.config = json.load(f)
-                log(f"[PROJECTION] Loaded config from {self.config_path}")
-            else:
-                # Create default config with EVENT support
-                self.config = {
-                    "devices": {},
-                    "global": {
-                        "auto_enable_new_devices": True,
-                        "auto_enable_new_tools": True,
-                        "auto_enable_new_events": False  # EVENT는 기본 숨김
-                    }
-                }
-                self.save_config()
-                log(f"[PROJECTION] Created default config at {self.config_path}")
+            # exists() 확인 없이 바로 열고, 없으면 FileNotFoundError로 분기
+            with open(self.config_path, 'r') as f:
+                self.config = json.load(f)
+            log(f"[PROJECTION] Loaded config from {self.config_path}")
+        except FileNotFoundError:
+            # Create default config with EVENT support
+            self.config = default_projection_config()
+            self.save_config()
+            log(f"[PROJECTION] Created default config at {self.config_path}")
         except Exception as e:
             log(f"[PROJECTION] Error loading config: {e}")
-            self.config = {
-                "devices": {}, 
-                "global": {
-                    "auto_enable_new_devices": True, 
-                    "auto_enable_new_tools": True,
-                    "auto_enable_new_events": False
-                }
-            }
+            self.config = default_projection_config()
     
     def save_config(self):
         """Save current configuration to file"""
+        # 임시 파일에 쓴 뒤 rename → projection manager가 반쯤 쓰인 파일을 읽지 않음
+        tmp_path = f"{self.config_path}.{uuid.uuid4().hex[:8]}.tmp"
         try:
-            with open(self.config_path, 'w') as f:
+            with open(tmp_path, 'w') as f:
                 json.dump(self.config, f, indent=2)
+            os.replace(tmp_path, self.config_path)
         except Exception as e:
             log(f"[PROJECTION] Error saving config: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
     
     def get_device_projection(self, device_id: str) -> Dict[str, Any]:
         """Get projection settings for a device"""
@@ -172,8 +175,13 @@ class ToolProjectionStore:
         """Auto-add new device to projection config if not exists"""
         with self._lock:
             if device_id not in self.config.get("devices", {}):
+                # 기본값은 루프 밖에서 한 번만 읽음
+                global_cfg = self.config.get("global", {})
+                default_event_enabled = global_cfg.get("auto_enable_new_events", False)
+                default_tool_enabled = global_cfg.get("auto_enable_new_tools", True)
+                
                 device_config = {
-                    "enabled": self.config.get("global", {}).get("auto_enable_new_devices", True),
+                    "enabled": global_cfg.get("auto_enable_new_devices", True),
                     "device_alias": None,
                     "tools": {}
                 }
@@ -183,13 +191,8 @@ class ToolProjectionStore:
                     tool_kind = tool.get("kind", "action")
                     if tool_name:
                         # KIND에 따라 다른 기본값
-                        if tool_kind == "event":
-                            default_enabled = self.config.get("global", {}).get("auto_enable_new_events", False)
-                        else:
-                            default_enabled = self.config.get("global", {}).get("auto_enable_new_tools", True)
-                        
                         device_config["tools"][tool_name] = {
-                            "enabled": default_enabled,
+                            "enabled": default_event_enabled if tool_kind == "event" else default_tool_enabled,
                             "kind": tool_kind,
                             "alias": None,
                             "description": None
@@ -303,13 +306,15 @@ class DeviceStore:
         with self._lock:
             if device_id not in self._by_id:
                 return None
-            return json.loads(json.dumps(self._by_id[device_id]))
+            # upsert/update는 최상위 키만 새 객체로 교체하므로 얕은 복사로 충분
+            return dict(self._by_id[device_id])
 
     def list(self) -> List[Dict[str, Any]]:
         with self._lock:
             out = []
             for d in self._by_id.values():
-                dd = json.loads(json.dumps(d))
+                # 최상위 "online"만 덮어쓰므로 얕은 복사로 충분
+                dd = dict(d)
                 last_status = dd.get("last_status", {})
                 ts = last_status.get("ts")
                 if ts:
@@ -334,6 +339,11 @@ class CommandWaiter:
             self._qmap[rid] = q
             return q
 
+    def discard(self, rid: str):
+        """응답을 더 기다리지 않는 request_id 정리"""
+        with self._lock:
+            self._qmap.pop(rid, None)
+
     def resolve(self, rid: str, payload: Dict[str, Any]):
         with self._lock:
             q = self._qmap.pop(rid, None)
@@ -403,9 +413,50 @@ def mqtt_thread():
 threading.Thread(target=mqtt_thread, daemon=True).start()
 
 # ========= Publish helper =========
+# 명령 발행용 MQTT 클라이언트 (최초 사용 시 한 번 생성, 이후 재사용)
+# 연결/재연결은 paho 네트워크 스레드가 backoff로 처리 → lock을 잡은 채 블로킹하지 않음
+PUB_CONNECT_WAIT_SEC = float(os.getenv("PUB_CONNECT_WAIT_SEC", "2"))
+_pub_client: Optional[mqtt.Client] = None
+_pub_lock = threading.Lock()
+_pub_connected = threading.Event()
+
+def _on_pub_connect(c, userdata, flags, reason_code, properties=None):
+    if reason_code.is_failure:
+        log(f"[mqtt] publisher connect failed rc={reason_code}")
+        return
+    _pub_connected.set()
+
+def _on_pub_disconnect(c, userdata, flags, reason_code, properties=None):
+    _pub_connected.clear()
+
+def get_pub_client() -> mqtt.Client:
+    """Return the shared publisher client (connects in the background on first use)"""
+    global _pub_client
+    with _pub_lock:
+        if _pub_client is None:
+            c = mqtt.Client(
+                callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+                client_id=f"bridge-pub-{uuid.uuid4().hex[:6]}",
+                protocol=mqtt.MQTTv5
+            )
+            c.on_connect = _on_pub_connect
+            c.on_disconnect = _on_pub_disconnect
+            c.reconnect_delay_set(min_delay=1, max_delay=30)
+            c.connect_async(MQTT_HOST, MQTT_PORT, keepalive=KEEPALIVE)
+            c.loop_start()  # 최초 연결과 끊긴 뒤 재연결 모두 paho 네트워크 스레드가 담당
+            _pub_client = c
+        return _pub_client
+
 def publish_cmd(device_id: str, tool: str, args: Any,
                 request_id: Optional[str]=None, timeout_ms: int=CMD_TIMEOUT_MS):
     rid = request_id or uuid.uuid4().hex
+    
+    # announce 캐시에 없는 device_id는 인자 파싱/waiter 등록 전에 바로 거절
+    if not device_store.get(device_id):
+        return False, {"ok": False, "error": {"code": "unknown_device",
+                                              "message": f"device_id '{device_id}' not found in announce cache"},
+                       "request_id": rid}
+    
     topic = f"mcp/dev/{device_id}/cmd"
     
     if isinstance(args, str):
@@ -425,34 +476,33 @@ def publish_cmd(device_id: str, tool: str, args: Any,
     payload = {"type":"device.command","tool":tool,"args":args,"request_id":rid}
     log(f"[DEBUG] Publishing to {topic}: {json.dumps(payload, indent=2)}")
     
-    q = cmd_waiter.register(rid)
-
-    if not device_store.get(device_id):
-        return False, {"ok": False, "error": {"code": "unknown_device",
-                                              "message": f"device_id '{device_id}' not found in announce cache"},
-                       "request_id": rid}
-
-    c = mqtt.Client(
-        callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
-        client_id=f"bridge-pub-{uuid.uuid4().hex[:6]}",
-        protocol=mqtt.MQTTv5
-    )
     try:
-        c.connect(MQTT_HOST, MQTT_PORT, keepalive=KEEPALIVE)
+        c = get_pub_client()
     except Exception as e:
         return False, {"ok": False, "error": {"code": "mqtt_connect_failed",
                                               "message": f"cannot connect to broker {MQTT_HOST}:{MQTT_PORT} ({e})"},
                        "request_id": rid}
+    
+    # 브로커에 아직/다시 연결 중이면 잠깐만 기다리고 실패 처리 (다른 명령 스레드를 막지 않음)
+    if not _pub_connected.wait(PUB_CONNECT_WAIT_SEC):
+        return False, {"ok": False, "error": {"code": "mqtt_connect_failed",
+                                              "message": f"not connected to broker {MQTT_HOST}:{MQTT_PORT}"},
+                       "request_id": rid}
 
-    c.loop_start()
-    c.publish(topic, json.dumps(payload), qos=0, retain=False)
-    c.loop_stop()
-    c.disconnect()
+    # 응답이 publish 직후 바로 올 수 있으므로 waiter는 publish 전에 등록
+    q = cmd_waiter.register(rid)
+    info = c.publish(topic, json.dumps(payload), qos=0, retain=False)
+    if info.rc != mqtt.MQTT_ERR_SUCCESS:
+        cmd_waiter.discard(rid)
+        return False, {"ok": False, "error": {"code": "mqtt_publish_failed",
+                                              "message": f"publish to {topic} failed ({mqtt.error_string(info.rc)})"},
+                       "request_id": rid}
 
     try:
         resp = q.get(timeout=timeout_ms/1000.0)
         return True, resp
     except queue.Empty:
+        cmd_waiter.discard(rid)
         return False, {"ok": False, "error": {"code":"timeout",
                                               "message": f"no event for request_id={rid} within {timeout_ms}ms"},
                        "request_id": rid}
@@ -471,6 +521,10 @@ def fetch_and_convert_to_base64(url: str, timeout: int = 10) -> Optional[str]:
         log(f"[BASE64] Failed to fetch/convert {url}: {e}")
         return None
 
+def text_content(text: str) -> List[TextContent]:
+    """텍스트 한 덩어리짜리 MCP 응답"""
+    return [TextContent(type="text", text=text)]
+
 def convert_response_to_content_list(resp: Dict[str, Any]) -> List[Union[ImageContent, TextContent]]:
     """Convert device response to MCP content list"""
     result = resp.get("result", {})
@@ -498,7 +552,28 @@ def convert_response_to_content_list(resp: Dict[str, Any]) -> List[Union[ImageCo
     
     return content
 
+async def run_device_command(device_id: str, tool: str, args: Any) -> List[Union[ImageContent, TextContent]]:
+    """publish_cmd + 응답 변환을 워커 스레드에서 실행 (응답 대기/이미지 다운로드가 이벤트 루프를 막지 않도록)"""
+    def _run():
+        ok, resp = publish_cmd(device_id, tool, args)
+        if not ok:
+            error_msg = resp.get("error", {}).get("message", "Unknown error")
+            return text_content(f"Error: {error_msg}")
+        return convert_response_to_content_list(resp)
+    
+    return await asyncio.to_thread(_run)
+
 # ========= JSON Schema to Pydantic Model =========
+# JSON Schema type → Python 타입 (모르는 타입은 str)
+JSON_TYPE_MAP = {
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+    "object": dict,
+    "array": list,
+    "string": str,
+}
+
 def json_schema_to_pydantic_model(name: str, schema: dict):
     """JSON Schema를 Pydantic 모델로 변환"""
     fields = {}
@@ -506,20 +581,7 @@ def json_schema_to_pydantic_model(name: str, schema: dict):
     required = schema.get("required", [])
     
     for prop_name, prop_schema in properties.items():
-        field_type = str
-        
-        if prop_schema.get("type") == "integer":
-            field_type = int
-        elif prop_schema.get("type") == "number":
-            field_type = float
-        elif prop_schema.get("type") == "boolean":
-            field_type = bool
-        elif prop_schema.get("type") == "object":
-            field_type = dict
-        elif prop_schema.get("type") == "array":
-            field_type = list
-        elif prop_schema.get("type") == "string":
-            field_type = str
+        field_type = JSON_TYPE_MAP.get(prop_schema.get("type"), str)
         
         default_value = ...
         if prop_name not in required:
@@ -536,6 +598,20 @@ def json_schema_to_pydantic_model(name: str, schema: dict):
 mcp = FastMCP("bridge-mcp")
 
 # ---- Resources ----
+# 고정 에러 본문은 import 시 한 번만 직렬화
+ERR_NOT_FOUND_JSON = json.dumps({"error": "not found"})
+ERR_DEVICE_NOT_FOUND_JSON = json.dumps({"error": "device not found"})
+
+def device_not_found_resource(uri: str, name: str, error_json: str) -> Resource:
+    """Resource returned when device_id is not in the announce cache"""
+    return Resource(
+        uri=uri,
+        name=name,
+        description="Device not found",
+        mimeType="application/json",
+        text=error_json
+    )
+
 @mcp.resource("bridge://devices")
 def res_devices() -> Resource:
     return Resource(
@@ -550,13 +626,7 @@ def res_devices() -> Resource:
 def res_device(device_id: str) -> Resource:
     d = device_store.get(device_id)
     if not d:
-        return Resource(
-            uri=f"bridge://device/{device_id}",
-            name="device",
-            description="Device not found",
-            mimeType="application/json",
-            text=json.dumps({"error":"not found"})
-        )
+        return device_not_found_resource(f"bridge://device/{device_id}", "device", ERR_NOT_FOUND_JSON)
     return Resource(
         uri=f"bridge://device/{device_id}",
         name="device",
@@ -593,13 +663,7 @@ def res_device_events(device_id: str) -> Resource:
     """
     device = device_store.get(device_id)
     if not device:
-        return Resource(
-            uri=f"bridge://device/{device_id}/events",
-            name="device_events",
-            description="Device not found",
-            mimeType="application/json",
-            text=json.dumps({"error": "device not found"})
-        )
+        return device_not_found_resource(f"bridge://device/{device_id}/events", "device_events", ERR_DEVICE_NOT_FOUND_JSON)
     
     tools = device.get("tools", [])
     events = []
@@ -644,20 +708,21 @@ def res_device_events(device_id: str) -> Resource:
 
 # ---- Static Tools ----
 @mcp.tool()
-def invoke(device_id: str, tool: str, args: dict | None = None) -> List[Union[ImageContent, TextContent]]:
+async def invoke(device_id: str, tool: str, args: dict | None = None) -> List[Union[ImageContent, TextContent]]:
     """Generic tool invoker (fallback for any device tool) - uses original tool names"""
     args = args or {}
-    ok, resp = publish_cmd(device_id, tool, args)
-    if not ok:
-        error_msg = resp.get("error", {}).get("message", "Unknown error")
-        return [TextContent(type="text", text=f"Error: {error_msg}")]
-    
-    return convert_response_to_content_list(resp)
+    return await run_device_command(device_id, tool, args)
 
 @mcp.tool()
 def list_devices() -> List[TextContent]:
     """List devices from announce/status cache with projection info (ACTION/EVENT counts)."""
     devices = device_store.list()
+    
+    # Projected ACTION tools 디바이스별 개수 (EVENT는 MCP tool이 아님) - 전체 목록을 한 번만 순회
+    projected_counts: Dict[str, int] = {}
+    for t in tool_registry.list_all_tools():
+        projected_counts[t['device_id']] = projected_counts.get(t['device_id'], 0) + 1
+    
     device_summary = []
     for device in devices:
         device_id = device['device_id']
@@ -665,33 +730,31 @@ def list_devices() -> List[TextContent]:
         
         # ACTION/EVENT 구분
         tools = device.get("tools", [])
-        actions_count = len([t for t in tools if t.get("kind", "action") == "action"])
-        events_count = len([t for t in tools if t.get("kind") == "event"])
+        actions_count = sum(1 for t in tools if t.get("kind", "action") == "action")
+        events_count = sum(1 for t in tools if t.get("kind") == "event")
         
         device_alias = projection_store.get_device_alias(device_id, device.get('name'))
         is_enabled = projection_store.is_device_enabled(device_id)
         
-        # Projected ACTION tools만 카운트 (EVENT는 MCP tool이 아님)
-        projected_actions = [t for t in tool_registry.list_all_tools() if t['device_id'] == device_id]
-        projected_count = len(projected_actions)
+        projected_count = projected_counts.get(device_id, 0)
         
         device_summary.append(
             f"• {device_id} → '{device_alias}' ({status}, {projected_count}/{actions_count} actions, {events_count} events, {'enabled' if is_enabled else 'disabled'})"
         )
     
     summary_text = f"Found {len(devices)} devices:\n" + "\n".join(device_summary)
-    return [TextContent(type="text", text=summary_text)]
+    return text_content(summary_text)
 
 @mcp.tool()
 def get_tools(device_id: str) -> List[TextContent]:
     """List a device's announced tools with projection status (ACTION and EVENT)."""
     d = device_store.get(device_id)
     if not d:
-        return [TextContent(type="text", text=f"Error: device_id '{device_id}' not found")]
+        return text_content(f"Error: device_id '{device_id}' not found")
     
     tools = d.get("tools", [])
     if not tools:
-        return [TextContent(type="text", text=f"Device {device_id} has no announced tools")]
+        return text_content(f"Device {device_id} has no announced tools")
     
     action_summary = []
     event_summary = []
@@ -728,7 +791,7 @@ def get_tools(device_id: str) -> List[TextContent]:
         result_lines.extend(event_summary)
     
     summary_text = "\n".join(result_lines)
-    return [TextContent(type="text", text=summary_text)]
+    return text_content(summary_text)
 
 # ---- Dynamic Tool Creation and Registration ----
 def register_dynamic_tools_for_device(device_id: str):
@@ -775,18 +838,12 @@ def register_dynamic_tools_for_device(device_id: str):
             ParamModel = json_schema_to_pydantic_model(f"{tool_key}_params", schema)
             
             def create_tool_func(device_id_copy, original_tool_name_copy, projected_tool_copy, param_model):
-                def tool_func(params: param_model) -> List[Union[ImageContent, TextContent]]:
+                async def tool_func(params: param_model) -> List[Union[ImageContent, TextContent]]:
                     """Dynamically generated projected device tool function with proper schema"""
                     args = params.dict()
                     log(f"[PROJECTED_TOOL] {projected_tool_copy['name']} ({original_tool_name_copy}) called with args: {json.dumps(args, indent=2)}")
                     
-                    ok, resp = publish_cmd(device_id_copy, original_tool_name_copy, args)
-                    
-                    if not ok:
-                        error_msg = resp.get("error", {}).get("message", "Unknown error")
-                        return [TextContent(type="text", text=f"Error: {error_msg}")]
-                    
-                    return convert_response_to_content_list(resp)
+                    return await run_device_command(device_id_copy, original_tool_name_copy, args)
                 
                 tool_func.__name__ = projected_tool_copy["name"]
                 tool_func.__doc__ = projected_tool_copy["description"]
@@ -815,6 +872,7 @@ def register_all_announced_devices():
 register_all_announced_devices()
 
 # ========= Minimal FastAPI App for MCP SSE + Projection Manager API =========
+from http import HTTPStatus
 from fastapi import FastAPI, HTTPException
 import uvicorn
 
@@ -6,7 +6,7 @@ Projection Manager v2 - EVENT 지원 + 실시간 이벤트 모니터링
 - EVENT 테스트 및 실시간 로그
 - MQTT events 토픽 구독
 """
-import os, sys, json, logging, socket, requests, threading
+import os, sys, json, copy, logging, socket, requests, threading, uuid
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional, List
 from pathlib import Path
@@ -125,41 +125,94 @@ class MQTTEventCollector:
 mqtt_collector = MQTTEventCollector(MQTT_HOST, MQTT_PORT) if MQTT_AVAILABLE else None
 
 # ========= Projection Config Manager =========
+def default_projection_config() -> Dict[str, Any]:
+    """기본 projection 설정 (호출마다 새 dict - 호출자가 수정해도 안전)"""
+    return {
+        "devices": {},
+        "global": {
+            "auto_enable_new_devices": True,
+            "auto_enable_new_tools": True,
+            "auto_enable_new_events": False
+        }
+    }
+
 class ProjectionConfigManager:
     def __init__(self, config_path: str):
         self.config_path = config_path
+        # (파일 키, parsed config) - bridge도 같은 파일을 쓰므로 파일 키로 무효화
+        self._cache: Optional[tuple] = None
+        # 설정 디렉터리는 한 번 만들면 계속 존재 → 매 저장마다 makedirs 하지 않음
+        self._dir_ready = False
         self.ensure_config_exists()
     
     def ensure_config_exists(self):
         if not Path(self.config_path).exists():
-            default_config = {
-                "devices": {},
-                "global": {
-                    "auto_enable_new_devices": True,
-                    "auto_enable_new_tools": True,
-                    "auto_enable_new_events": False
-                }
-            }
-            self.save_config(default_config)
+            self.save_config(default_projection_config())
             log(f"[CONFIG] Created default config at {self.config_path}")
     
     def load_config(self) -> Dict[str, Any]:
+        """Return parsed config; re-reads the file only when it changed on disk (treat result as read-only)"""
         try:
+            file_key = self._file_key()
+            if self._cache and self._cache[0] == file_key:
+                return self._cache[1]
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                config = json.load(f)
+            self._cache = (file_key, config)
+            return config
         except Exception as e:
             log(f"[CONFIG] Error loading config: {e}")
-            return {"devices": {}, "global": {"auto_enable_new_devices": True, "auto_enable_new_tools": True, "auto_enable_new_events": False}}
+            return default_projection_config()
+    
+    def _file_key(self, path: Optional[str] = None) -> tuple:
+        """
+        설정 파일 식별 키 (inode, mtime_ns, size)
+        
+        모든 writer가 os.replace로 쓰므로 저장할 때마다 inode가 바뀜
+        → mtime 해상도가 거친 파일시스템에서 같은 tick에 덮어써도 변경을 놓치지 않음
+        """
+        st = os.stat(path or self.config_path)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    
+    def _is_unchanged(self, config: Dict[str, Any]) -> bool:
+        """
+        config가 디스크에 있는 내용과 같은지
+        
+        캐시는 (쓴 내용의 파일 키, 쓴 내용의 사본) 쌍이므로 현재 파일 키가 같을 때만 비교
+        """
+        try:
+            file_key = self._file_key()
+        except OSError:
+            return False
+        return self._cache is not None and self._cache[0] == file_key and self._cache[1] == config
     
     def save_config(self, config: Dict[str, Any]) -> bool:
+        # 내용이 같으면 다시 쓰지 않음 (파일이 그대로이므로 캐시도 그대로 유효)
+        if self._is_unchanged(config):
+            log(f"[CONFIG] Config unchanged, skipped write to {self.config_path}")
+            return True
+        # 임시 파일에 쓴 뒤 rename → bridge가 반쯤 쓰인 파일을 읽지 않음
+        tmp_path = f"{self.config_path}.{uuid.uuid4().hex[:8]}.tmp"
         try:
-            os.makedirs(os.path.dirname(self.config_path) or '.', exist_ok=True)
-            with open(self.config_path, 'w', encoding='utf-8') as f:
+            if not self._dir_ready:
+                os.makedirs(os.path.dirname(self.config_path) or '.', exist_ok=True)
+                self._dir_ready = True
+            with open(tmp_path, 'w', encoding='utf-8') as f:
                 json.dump(config, f, indent=2, ensure_ascii=False)
+            # inode/mtime/size는 rename 후에도 그대로 → replace 전에 임시 파일로 키 계산
+            # (replace 뒤에 stat하면 그 사이 다른 writer가 바꾼 파일의 키를 우리 내용과 묶을 수 있음)
+            file_key = self._file_key(tmp_path)
+            os.replace(tmp_path, self.config_path)
+            # 호출자가 넘긴 dict를 나중에 수정해도 "디스크 내용"이 바뀌지 않도록 사본 보관
+            self._cache = (file_key, copy.deepcopy(config))
             log(f"[CONFIG] Saved config to {self.config_path}")
             return True
         except Exception as e:
             log(f"[CONFIG] Error saving config: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
             return False
 
 config_manager = ProjectionConfigManager(PROJECTION_CONFIG_PATH)
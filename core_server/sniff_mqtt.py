@@ -13,7 +13,7 @@ def on_connect(c,u,f,rc,p=None):
 
 def on_message(c,u,m):
     try: s = m.payload.decode("utf-8","ignore")
-    except: s = f"<{len(m.payload)} bytes>"
+    except Exception: s = f"<{len(m.payload)} bytes>"
     log(f"[sniff] {m.topic}: {s[:200]}")
 
 cli = mqtt.Client(callback_api_version=mqtt.CallbackAPIVersion.VERSION2, protocol=mqtt.MQTTv5)
@@ -2,7 +2,6 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Callable
 import importlib
-import inspect
 
 class ActionBase(ABC):
     """Action 추상 클래스"""
@@ -56,22 +55,28 @@ class ActionBase(ABC):
             raise ValueError("Action data must have 'type' field")
         
         # Registry에서 찾기
-        if action_type in cls._registry:
-            action_class = cls._registry[action_type]
+        action_class = cls._registry.get(action_type)
+        if action_class is not None:
             return action_class(data)
         
         # Registry에 없으면 동적 로드 시도
         try:
             module = importlib.import_module(f'.{action_type}', package='reflex.actions')
+        except ImportError:
+            module = None
+        
+        if module is not None:
+            # import 시 @register 데코레이터가 등록했으면 바로 사용
+            action_class = cls._registry.get(action_type)
+            if action_class is not None:
+                return action_class(data)
             
-            # 모듈에서 ActionBase 상속한 클래스 찾기
-            for name, obj in inspect.getmembers(module, inspect.isclass):
-                if issubclass(obj, cls) and obj is not cls:
+            # 데코레이터 없는 모듈: 모듈에서 ActionBase 상속한 클래스 찾기
+            for obj in vars(module).values():
+                if isinstance(obj, type) and obj is not cls and issubclass(obj, cls):
                     # 자동 등록
                     cls._registry[action_type] = obj
                     return obj(data)
-        except ImportError:
-            pass
         
         raise ValueError(f"Unknown action type: {action_type}")
     
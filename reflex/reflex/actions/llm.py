@@ -1,9 +1,22 @@
 # reflex/actions/llm.py - 디버깅 버전
-from typing import Dict, Any, Callable
+from typing import Dict, Any, Callable, Optional
+import asyncio
 import os
+import time
 from anthropic import AsyncAnthropic
 from .base import ActionBase
 
+# API 키별 공유 클라이언트 (LLMAction 인스턴스끼리 httpx 커넥션 풀 재사용)
+_CLIENTS: Dict[str, AsyncAnthropic] = {}
+
+
+def _get_client(api_key: str) -> AsyncAnthropic:
+    client = _CLIENTS.get(api_key)
+    if client is None:
+        client = _CLIENTS[api_key] = AsyncAnthropic(api_key=api_key)
+    return client
+
+
 @ActionBase.register('llm')
 class LLMAction(ActionBase):
     """LLM 기반 Action (Tool Calling)"""
@@ -15,6 +28,30 @@ class LLMAction(ActionBase):
         self.model = config.get('model', 'claude-sonnet-4-20250514')
         self.messages = config.get('messages', [])
         self.temperature = config.get('temperature', 0.7)
+        # 0이면 끔. 메시지가 고정이라 같은 툴 구성이면 LLM 판단(툴 호출 목록)도 같음
+        # → TTL 동안은 LLM 호출을 건너뛰고 저장된 툴 호출만 다시 실행
+        self.cache_ttl_sec = config.get('cache_ttl_sec', 0)
+        
+        # 메시지는 config에서만 결정되므로 생성 시 한 번만 정리
+        self._system_param, self._user_messages = self._prepare_messages(self.messages)
+        
+        # 실행마다 바뀌지 않는 API 호출 파라미터
+        self._base_params = {
+            "model": self.model,
+            "max_tokens": 4096,
+            "temperature": self.temperature,
+            "messages": self._user_messages,
+        }
+        # system이 있을 때만 추가
+        if self._system_param:
+            self._base_params["system"] = self._system_param
+        
+        # _prepare_tool_specs 결과 캐시 (같은 툴 함수 집합이면 재사용)
+        self._spec_cache_key = None
+        self._spec_cache: list = []
+        
+        # (툴 구성 키, 만료 시각, [(툴 이름, 인자)], 텍스트 응답, raw 응답)
+        self._plan_cache: Optional[tuple] = None
         
         print(f"[DEBUG] LLMAction initialized:")
         print(f"  - config keys: {list(config.keys())}")
@@ -22,10 +59,11 @@ class LLMAction(ActionBase):
         
         # API 클라이언트 초기화
         if self.api == 'claude':
-            api_key = os.environ.get('ANTHROPIC_API_KEY')
+            # 호출자가 이미 읽어둔 키를 넘기면 그대로 사용 (to_dict에는 저장하지 않음)
+            api_key = config.get('api_key') or os.environ.get('ANTHROPIC_API_KEY')
             if not api_key:
                 raise ValueError("ANTHROPIC_API_KEY environment variable not set")
-            self.client = AsyncAnthropic(api_key=api_key)
+            self.client = _get_client(api_key)
         else:
             raise ValueError(f"Unsupported API: {self.api}")
     
@@ -40,59 +78,38 @@ class LLMAction(ActionBase):
             # 1. Tool 스펙 준비
             tool_specs = self._prepare_tool_specs(tools)
             
-            # 2. 메시지 처리
-            system_content = None
-            user_messages = []
-            
-            for msg in self.messages:
-                role = msg.get('role', 'user')
-                content = msg.get('content', '')
-                
-                if role == 'system':
-                    system_content = content
-                elif role == 'user':
-                    user_messages.append({
-                        'role': 'user',
-                        'content': content
-                    })
-                elif role == 'assistant':
-                    user_messages.append({
-                        'role': 'assistant',
-                        'content': content
-                    })
-            
-            # user 메시지가 없으면 기본 메시지
-            if not user_messages:
-                user_messages = [{
-                    'role': 'user',
-                    'content': 'Please use the available tools as needed.'
-                }]
+            cached = self._cached_plan()
+            if cached is not None:
+                calls, text_response, response = cached
+                print(f"\n🤖 Reusing cached LLM plan ({len(calls)} tool calls)")
+                tool_results = [
+                    r for r in await asyncio.gather(
+                        *(self._invoke_tool(tools, name, args) for name, args in calls)
+                    )
+                    if r is not None
+                ]
+                return {
+                    'success': True,
+                    'tool_calls': tool_results,
+                    'text': text_response,
+                    'raw_response': response,
+                    'cached': True
+                }
             
             print(f"\n🤖 Calling LLM...")
             print(f"   Model: {self.model}")
             print(f"   Tools: {list(tools.keys())}")
             
-            # system 파라미터 준비
-            if system_content:
-                system_param = [{"type": "text", "text": system_content}]
-                print(f"   [DEBUG] System param: {system_param}")
+            if self._system_param:
+                print(f"   [DEBUG] System param: {self._system_param}")
             else:
                 print(f"   [DEBUG] No system prompt - will omit parameter")
             
-            print(f"   [DEBUG] User messages: {user_messages}")
+            print(f"   [DEBUG] User messages: {self._user_messages}")
             print(f"   [DEBUG] About to call API...")
             
-            # 3. LLM 호출
-            call_params = {
-                "model": self.model,
-                "max_tokens": 4096,
-                "temperature": self.temperature,
-                "messages": user_messages,
-            }
-            
-            # system이 있을 때만 추가
-            if system_content:
-                call_params["system"] = system_param
+            # 2. LLM 호출 (메시지/system은 __init__에서 미리 준비됨)
+            call_params = dict(self._base_params)
             
             # tools가 있을 때만 추가
             if tool_specs:
@@ -100,43 +117,61 @@ class LLMAction(ActionBase):
             
             print(f"   [DEBUG] Call params keys: {list(call_params.keys())}")
             
-            response = await self.client.messages.create(**call_params)
-            
-            print(f"   [DEBUG] API call succeeded!")
-            
-            # 4. Tool Calling 처리
-            tool_results = []
+            # 3. 스트리밍 호출 + Tool Calling 처리
+            # tool_use 블록이 완성되는 즉시 툴을 task로 띄워서 서로 (그리고 나머지 응답 생성과) 병렬 실행
+            pending = []
+            calls = []
             text_response = ""
             
-            for block in response.content:
-                if block.type == 'tool_use':
-                    tool_name = block.name
-                    tool_args = block.input
-                    
-                    print(f"   🔧 LLM calls: {tool_name}({tool_args})")
+            try:
+                async with self.client.messages.stream(**call_params) as stream:
+                    async for stream_event in stream:
+                        if stream_event.type != 'content_block_stop':
+                            continue
+                        
+                        block = stream_event.content_block
+                        if block.type == 'tool_use':
+                            calls.append((block.name, block.input))
+                            pending.append(asyncio.create_task(
+                                self._invoke_tool(tools, block.name, block.input)
+                            ))
+                        
+                        elif block.type == 'text':
+                            text_response = block.text
+                            print(f"   💬 LLM: {text_response}")
                     
-                    if tool_name in tools:
-                        try:
-                            result = await tools[tool_name](**tool_args)
-                            tool_results.append({
-                                'tool': tool_name,
-                                'args': tool_args,
-                                'result': result
-                            })
-                            print(f"      ✓ Result: {result}")
-                        except Exception as e:
-                            print(f"      ✗ Error: {e}")
-                            tool_results.append({
-                                'tool': tool_name,
-                                'args': tool_args,
-                                'error': str(e)
-                            })
-                    else:
-                        print(f"      ⚠️ Tool not available")
+                    response = await stream.get_final_message()
                 
-                elif block.type == 'text':
-                    text_response = block.text
-                    print(f"   💬 LLM: {text_response}")
+                # gather는 호출 순서대로 결과를 돌려줌
+                tool_results = [r for r in await asyncio.gather(*pending) if r is not None]
+            except Exception as e:
+                # 스트림이 도중에 실패해도 이미 띄운 툴은 장치에서 실행 중일 수 있음
+                # → 끝까지 기다려서 실제로 실행된 결과를 에러와 함께 반환
+                finished = await asyncio.gather(*pending, return_exceptions=True)
+                print(f"   ❌ LLM execution error: {e}")
+                import traceback
+                traceback.print_exc()
+                return {
+                    'success': False,
+                    'error': str(e),
+                    'tool_calls': [r for r in finished if isinstance(r, dict)]
+                }
+            finally:
+                # 취소 등으로 빠져나가면 아직 도는 툴 task 정리
+                for task in pending:
+                    if not task.done():
+                        task.cancel()
+            
+            print(f"   [DEBUG] API call succeeded!")
+            
+            if self.cache_ttl_sec:
+                self._plan_cache = (
+                    self._spec_cache_key,
+                    time.monotonic() + self.cache_ttl_sec,
+                    calls,
+                    text_response,
+                    response
+                )
             
             return {
                 'success': True,
@@ -155,8 +190,94 @@ class LLMAction(ActionBase):
                 'error': str(e)
             }
     
+    def _cached_plan(self) -> Optional[tuple]:
+        """현재 툴 구성에 대해 아직 유효한 (툴 호출 목록, 텍스트, raw 응답) 또는 None"""
+        if not self.cache_ttl_sec or self._plan_cache is None:
+            return None
+        key, expires_at, calls, text_response, response = self._plan_cache
+        if key != self._spec_cache_key or time.monotonic() >= expires_at:
+            self._plan_cache = None
+            return None
+        return calls, text_response, response
+    
+    @staticmethod
+    def _prepare_messages(messages: list) -> tuple:
+        """config 메시지를 (system 파라미터, user/assistant 메시지 리스트)로 분리"""
+        system_content = None
+        user_messages = []
+        
+        for msg in messages:
+            role = msg.get('role', 'user')
+            content = msg.get('content', '')
+            
+            if role == 'system':
+                system_content = content
+            elif role == 'user':
+                user_messages.append({
+                    'role': 'user',
+                    'content': content
+                })
+            elif role == 'assistant':
+                user_messages.append({
+                    'role': 'assistant',
+                    'content': content
+                })
+        
+        # user 메시지가 없으면 기본 메시지
+        if not user_messages:
+            user_messages = [{
+                'role': 'user',
+                'content': 'Please use the available tools as needed.'
+            }]
+        
+        # system 파라미터 준비
+        system_param = None
+        if system_content:
+            # 매 실행마다 같은 system 프롬프트 → prompt cache 대상으로 표시
+            system_param = [{
+                "type": "text",
+                "text": system_content,
+                "cache_control": {"type": "ephemeral"}
+            }]
+        
+        return system_param, user_messages
+    
+    async def _invoke_tool(
+        self,
+        tools: Dict[str, Callable],
+        tool_name: str,
+        tool_args: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """LLM이 요청한 툴 1개 실행 (툴이 없으면 None)"""
+        print(f"   🔧 LLM calls: {tool_name}({tool_args})")
+        
+        if tool_name not in tools:
+            print(f"      ⚠️ Tool not available")
+            return None
+        
+        try:
+            result = await tools[tool_name](**tool_args)
+            print(f"      ✓ Result: {result}")
+            return {
+                'tool': tool_name,
+                'args': tool_args,
+                'result': result
+            }
+        except Exception as e:
+            print(f"      ✗ Error: {e}")
+            return {
+                'tool': tool_name,
+                'args': tool_args,
+                'error': str(e)
+            }
+    
     def _prepare_tool_specs(self, tools: Dict[str, Callable]) -> list:
         """Tool을 Anthropic API 형식으로 변환"""
+        # reflex 툴 구성은 보통 실행마다 같으므로 (이름, 함수) 조합이 같으면 캐시 반환
+        cache_key = tuple(tools.items())
+        if cache_key == self._spec_cache_key:
+            return self._spec_cache
+        
         specs = []
         
         for tool_name, tool_func in tools.items():
@@ -189,6 +310,12 @@ class LLMAction(ActionBase):
             
             specs.append(spec)
         
+        # 마지막 tool에 cache 마커를 달면 tool 정의 전체가 prompt cache 대상이 됨
+        if specs:
+            specs[-1]["cache_control"] = {"type": "ephemeral"}
+        
+        self._spec_cache_key = cache_key
+        self._spec_cache = specs
         return specs
     
     def to_dict(self) -> Dict[str, Any]:
@@ -197,7 +324,8 @@ class LLMAction(ActionBase):
             'api': self.api,
             'model': self.model,
             'messages': self.messages,
-            'temperature': self.temperature
+            'temperature': self.temperature,
+            'cache_ttl_sec': self.cache_ttl_sec
         }
     
     def __repr__(self):
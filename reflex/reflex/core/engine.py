@@ -1,6 +1,9 @@
 # reflex/core/engine.py
 import asyncio
-from typing import Dict, List, Any
+import heapq
+import os
+import time
+from typing import Dict, List, Any, Mapping, Optional
 
 from .reflex import Reflex
 from .state import WorldState
@@ -8,13 +11,20 @@ from ..tools.registry import ToolRegistry
 from reflex.triggers.base import TriggerBase
 from reflex.actions.base import ActionBase
 
+# 발화 시각을 알 수 없는 trigger가 있을 때의 체크 주기 (초)
+TICK_INTERVAL_SEC = 1.0
+# 다음 발화까지 아무리 멀어도 이 시간마다 한 번은 깨어남 (시계 변경 대비)
+MAX_IDLE_SEC = 60.0
+# 동시에 실행되는 action 최대 개수 (MCP 툴 서버/LLM API 보호)
+MAX_CONCURRENT_ACTIONS = int(os.environ.get('REFLEX_MAX_CONCURRENT_ACTIONS', 32))
+
 
 class ReflexEngine:
     """
     Reflex 실행 엔진
 
     역할:
-    1. Schedule 체크 (1초마다)
+    1. Schedule 체크 (다음 발화 시각까지 대기)
     2. Reflex 매칭 & 실행
     3. Lifecycle 관리
     """
@@ -24,6 +34,17 @@ class ReflexEngine:
         self.state = state
         self.reflexes: Dict[str, Reflex] = {}
         self.running = False
+        # reflex 추가/활성화 시 대기 중인 메인 루프를 깨움
+        self._wakeup: Optional[asyncio.Event] = None
+        self._action_slots = asyncio.Semaphore(MAX_CONCURRENT_ACTIONS)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 만료 관리: (만료 epoch 초, reflex_id) min-heap + max_runs 도달한 reflex id
+        self._expiry_heap: List[tuple] = []
+        self._pending_expiry: set = set()
+        # reflexes 구성이 바뀔 때만 순회용 tuple을 다시 만듦
+        self._reflexes_version = 0
+        self._reflexes_tuple: tuple = ()
+        self._reflexes_tuple_version = 0
 
     # =========================
     # Validation helpers
@@ -53,6 +74,10 @@ class ReflexEngine:
         missing = [t for t in reflex.tools if t not in self.tool_registry.tools]
         if missing:
             errors.append(f"Tools not found in registry: {missing}")
+            for name in missing:
+                suggestions = self.tool_registry.search_tools(name, limit=3)
+                if suggestions:
+                    errors.append(f"'{name}' → did you mean {suggestions}?")
 
         return errors
 
@@ -61,12 +86,14 @@ class ReflexEngine:
     # =========================
     async def start(self):
         """엔진 시작"""
-        self.running = True
+        self._loop = asyncio.get_running_loop()
         
         # 1. MCP Bridge에 연결
         print("🔌 Connecting to MCP Bridge...")
         if not await self.tool_registry.connect():
             print("❌ Failed to connect to MCP Bridge. Exiting.")
+            # 연결 도중 열린 SSE 스트림 정리
+            await self.tool_registry.disconnect()
             return
         
         # 2. 툴 로드
@@ -92,13 +119,18 @@ class ReflexEngine:
         # 유효하지 않은 reflex 제거
         for reflex_id in invalid_reflexes:
             del self.reflexes[reflex_id]
+            self._reflexes_version += 1
         
         if invalid_reflexes:
             print(f"⚠️ Removed {len(invalid_reflexes)} invalid reflex(es)\n")
         
-        print("🚀 Reflex Engine started")
-        print(f"   Loaded {len(self.reflexes)} reflex(es)")
-        print(f"   Available tools: {self.tool_registry.list_tools()}\n")
+        # 연결/검증이 모두 끝난 뒤에만 running 상태로 전환
+        self.running = True
+        print(
+            "🚀 Reflex Engine started\n"
+            f"   Loaded {len(self.reflexes)} reflex(es)\n"
+            f"   Available tools: {self.tool_registry.list_tools()}\n"
+        )
 
         try:
             await self._main_loop()
@@ -121,29 +153,78 @@ class ReflexEngine:
         print("🛑 Reflex Engine stopped")
 
     async def _main_loop(self):
-        """메인 실행 루프 (1초마다)"""
+        """메인 실행 루프 (다음 발화 시각까지 잠들었다가 실행)"""
         print("⏰ Schedule loop started\n")
+        self._wakeup = asyncio.Event()
 
         while self.running:
             try:
                 event = {
                     "type": "schedule_tick",
-                    "timestamp": asyncio.get_event_loop().time(),
+                    "timestamp": self._loop.time(),
                 }
 
-                for reflex in list(self.reflexes.values()):
-                    await self._check_and_execute(reflex, event)
+                # 같은 tick 안에서는 모든 reflex가 같은 상태 스냅샷을 공유 (읽기 전용)
+                current_state = self.state.snapshot()
+
+                # 발화한 reflex들은 서로 기다리지 않고 동시에 실행 (동시 action 수는 semaphore로 제한)
+                await asyncio.gather(*(
+                    self._check_and_execute(reflex, event, current_state)
+                    for reflex in self._reflexes_snapshot()
+                ))
 
                 await self._cleanup_expired()
-                await asyncio.sleep(1)
+                await self._wait_next_wakeup()
 
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 print(f"❌ Loop error: {e}")
-                await asyncio.sleep(1)
-
-    async def _check_and_execute(self, reflex: Reflex, event: Dict[str, Any]):
+                await asyncio.sleep(TICK_INTERVAL_SEC)
+
+    def _next_wakeup_delay(self) -> float:
+        """가장 가까운 trigger 발화 시각까지 남은 시간 (초)"""
+        deadline = None
+        for reflex in self._reflexes_snapshot():
+            if not reflex.enabled:
+                continue
+            fire_at = reflex.trigger.next_fire_time()
+            if fire_at is None:
+                return TICK_INTERVAL_SEC
+            if deadline is None or fire_at < deadline:
+                deadline = fire_at
+
+        # 이미 제거된 reflex(max_runs 도달, remove_reflex)의 만료 항목은 버림
+        # → 죽은 항목 때문에 TTL 시각에 헛되이 깨어나지 않음
+        while self._expiry_heap and self._expiry_heap[0][1] not in self.reflexes:
+            heapq.heappop(self._expiry_heap)
+
+        # temporary reflex 만료 시각에도 깨어나서 정리
+        if self._expiry_heap:
+            expire_ts = self._expiry_heap[0][0]
+            if deadline is None or expire_ts < deadline:
+                deadline = expire_ts
+
+        if deadline is None:
+            return MAX_IDLE_SEC
+        return min(max(deadline - time.time(), 0.0), MAX_IDLE_SEC)
+
+    async def _wait_next_wakeup(self):
+        """다음 발화 시각까지 대기 (reflex 추가/활성화 시 즉시 깨어남)"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_wakeup_delay())
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    def _notify(self):
+        """대기 중인 메인 루프 깨우기"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _check_and_execute(
+        self, reflex: Reflex, event: Dict[str, Any], current_state: Mapping[str, Any]
+    ):
         """Reflex 체크 & 실행"""
         if not reflex.enabled:
             return
@@ -152,7 +233,6 @@ class ReflexEngine:
             return
 
         try:
-            current_state = self.state.get_all()
             should_trigger = await reflex.trigger.check(event, current_state)
             if not should_trigger:
                 return
@@ -166,15 +246,17 @@ class ReflexEngine:
                 print(f"   ⚠️ No tools available")
                 return
 
-            result = await reflex.action.execute(
-                event=event, state=current_state, tools=available_tools
-            )
+            async with self._action_slots:
+                result = await reflex.action.execute(
+                    event=event, state=current_state, tools=available_tools
+                )
 
             reflex.increment_runs()
 
             if reflex.lifecycle.max_runs:
                 if reflex.metadata["runs"] >= reflex.lifecycle.max_runs:
                     reflex.enabled = False
+                    self._pending_expiry.add(reflex.id)
                     print(f"   ⏹️ Reached max_runs ({reflex.lifecycle.max_runs}), disabled")
 
             print(f"   ✅ Executed successfully")
@@ -194,14 +276,44 @@ class ReflexEngine:
             print()
 
     async def _cleanup_expired(self):
-        """만료된 Reflex 정리"""
-        expired_ids = [
-            rid for rid, r in self.reflexes.items() if r.should_expire()
-        ]
+        """만료된 Reflex 정리 (만료 예정인 것만 확인)"""
+        expired_ids = self._pending_expiry
+        self._pending_expiry = set()
+
+        # expired()는 now > expire_ts 일 때만 True → 같은 기준(<)으로 꺼냄
+        now = time.time()
+        while self._expiry_heap and self._expiry_heap[0][0] < now:
+            _, rid = heapq.heappop(self._expiry_heap)
+            expired_ids.add(rid)
+
         for rid in expired_ids:
-            reflex = self.reflexes[rid]
+            reflex = self.reflexes.get(rid)
+            if reflex is None:
+                continue
+            if not reflex.should_expire():
+                # 아직 남은 만료 시각만 다시 등록 (지난 시각을 다시 넣으면 루프가 쉬지 않고 돎)
+                expire_ts = reflex.lifecycle.expire_ts
+                if expire_ts is not None and expire_ts > now:
+                    self._schedule_expiry(reflex)
+                continue
             print(f"🗑️ Reflex '{reflex.name}' expired and removed")
             del self.reflexes[rid]
+            self._reflexes_version += 1
+
+    def _reflexes_snapshot(self) -> tuple:
+        """순회용 reflex tuple (추가/제거가 있었을 때만 재생성)"""
+        if self._reflexes_tuple_version != self._reflexes_version:
+            self._reflexes_tuple = tuple(self.reflexes.values())
+            self._reflexes_tuple_version = self._reflexes_version
+        return self._reflexes_tuple
+
+    def _schedule_expiry(self, reflex: Reflex):
+        """temporary reflex의 만료 시각을 heap에 등록"""
+        if reflex.should_expire():
+            self._pending_expiry.add(reflex.id)
+        elif reflex.lifecycle.type == "temporary" and reflex.lifecycle.expire_ts is not None:
+            # persistent는 expire_at이 있어도 expired()가 항상 False → heap에 넣지 않음
+            heapq.heappush(self._expiry_heap, (reflex.lifecycle.expire_ts, reflex.id))
 
     # ============================================
     # Reflex 관리 API
@@ -224,12 +336,18 @@ class ReflexEngine:
                 return False
 
         self.reflexes[reflex.id] = reflex
-        print(f"➕ Added reflex: {reflex.name}")
-        print(f"   ID: {reflex.id}")
-        print(f"   Trigger: {reflex.trigger}")
-        print(f"   Action: {reflex.action}")
-        print(f"   Tools: {reflex.tools}")
-        print(f"   Lifecycle: {reflex.lifecycle.type}\n")
+        self._reflexes_version += 1
+        self._schedule_expiry(reflex)
+        # 여러 줄을 print 한 번으로 출력 (줄마다 stdout lock/flush 하지 않음)
+        print(
+            f"➕ Added reflex: {reflex.name}\n"
+            f"   ID: {reflex.id}\n"
+            f"   Trigger: {reflex.trigger}\n"
+            f"   Action: {reflex.action}\n"
+            f"   Tools: {reflex.tools}\n"
+            f"   Lifecycle: {reflex.lifecycle.type}\n"
+        )
+        self._notify()
         return True
 
     def remove_reflex(self, reflex_id: str):
@@ -237,6 +355,7 @@ class ReflexEngine:
         if reflex_id in self.reflexes:
             reflex = self.reflexes[reflex_id]
             del self.reflexes[reflex_id]
+            self._reflexes_version += 1
             print(f"➖ Removed reflex: {reflex.name}")
 
     def get_reflex(self, reflex_id: str) -> Reflex:
@@ -261,6 +380,7 @@ class ReflexEngine:
         if reflex_id in self.reflexes:
             self.reflexes[reflex_id].enabled = True
             print(f"✓ Reflex {reflex_id} enabled")
+            self._notify()
 
     def disable_reflex(self, reflex_id: str):
         """Reflex 비활성화"""
@@ -1,9 +1,10 @@
 # reflex/core/lifecycle.py
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
+import time
 
-@dataclass
+@dataclass(slots=True)
 class Lifecycle:
     """
     Reflex 생명주기 관리
@@ -17,6 +18,7 @@ class Lifecycle:
     max_runs: Optional[int] = None  # 최대 실행 횟수 (None=무제한)
     created_at: Optional[str] = None  # ISO datetime
     expire_at: Optional[str] = None  # ISO datetime (자동 계산됨)
+    _expire_ts: Optional[float] = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         # 생성 시간 기록
@@ -27,17 +29,26 @@ class Lifecycle:
         if self.type == "temporary" and self.ttl_sec and not self.expire_at:
             expire_time = datetime.now() + timedelta(seconds=self.ttl_sec)
             self.expire_at = expire_time.isoformat()
+        
+        # expired()가 자주 불리므로 ISO 문자열은 한 번만 파싱해서 epoch 초로 보관
+        if self.expire_at:
+            self._expire_ts = datetime.fromisoformat(self.expire_at).timestamp()
     
     def expired(self) -> bool:
         """시간상 만료되었는지"""
         if self.type == "persistent":
             return False
         
-        if self.expire_at:
-            return datetime.now() > datetime.fromisoformat(self.expire_at)
+        if self._expire_ts is not None:
+            return time.time() > self._expire_ts
         
         return False
     
+    @property
+    def expire_ts(self) -> Optional[float]:
+        """만료 시각 (epoch 초, 없으면 None)"""
+        return self._expire_ts
+    
     def to_dict(self) -> Dict[str, Any]:
         return {
             'type': self.type,
@@ -6,7 +6,7 @@ from .lifecycle import Lifecycle
 from ..triggers.base import TriggerBase
 from ..actions.base import ActionBase
 
-@dataclass
+@dataclass(slots=True)
 class Reflex:
     """
     단일 자동화 규칙
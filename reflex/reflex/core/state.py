@@ -1,5 +1,6 @@
 # reflex/core/state.py
-from typing import Dict, Any
+from typing import Dict, Any, Mapping
+from types import MappingProxyType
 import asyncio
 
 class WorldState:
@@ -7,6 +8,9 @@ class WorldState:
     전역 상태 저장소
     
     모든 Reflex가 공유하는 상태
+    
+    copy-on-write: 쓰기는 새 dict를 만들어 참조를 교체하고, 한 번 공개된 dict는
+    절대 수정하지 않음 → 읽기는 lock 없이 현재 dict를 그대로 봄
     """
     
     def __init__(self):
@@ -16,21 +20,26 @@ class WorldState:
     async def set(self, key: str, value: Any):
         """상태 설정"""
         async with self._lock:
-            self._state[key] = value
+            new_state = dict(self._state)
+            new_state[key] = value
+            self._state = new_state
     
     async def get(self, key: str, default=None) -> Any:
         """상태 조회"""
-        async with self._lock:
-            return self._state.get(key, default)
+        return self._state.get(key, default)
     
     def get_all(self) -> Dict[str, Any]:
         """모든 상태 반환 (복사본)"""
         return dict(self._state)
     
+    def snapshot(self) -> Mapping[str, Any]:
+        """현재 상태의 읽기 전용 뷰 (복사 없음, 이후 쓰기의 영향을 받지 않음)"""
+        return MappingProxyType(self._state)
+    
     async def update(self, updates: Dict[str, Any]):
         """여러 키 한번에 업데이트"""
         async with self._lock:
-            self._state.update(updates)
+            self._state = {**self._state, **updates}
     
     def __repr__(self):
         return f"WorldState({len(self._state)} keys)"
\ No newline at end of file
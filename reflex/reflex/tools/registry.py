@@ -1,13 +1,80 @@
 # reflex/tools/registry.py
-from typing import Dict, Any, Callable, List
+from typing import Dict, Any, Callable, List, Optional, Tuple
 from contextlib import AsyncExitStack
 from mcp import ClientSession
 from mcp.client.sse import sse_client
 import httpx
+import copy
+import json
 import logging
+import math
+import re
+import time
+from collections import Counter, OrderedDict
+
+try:
+    import orjson  # 선택 의존성: 있으면 캐시 키 생성이 빨라짐
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+
+def _fingerprint(obj: Any) -> bytes:
+    """캐시 키용 직렬화 (key 정렬, 같은 내용이면 같은 값)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, sort_keys=True, default=str).encode()
+
+# 툴 검색용 토큰 (영문/숫자/한글 단어, '_'로도 분리)
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+def _tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+# 툴 호출 실패 응답 (호출마다 copy해서 반환)
+_ERR_NOT_CONNECTED = {'success': False, 'error': 'Not connected to MCP Bridge'}
+
+def _content_value(content: Any) -> Any:
+    """MCP content 항목에서 text/data 꺼내기 (없으면 None)"""
+    if hasattr(content, 'text'):
+        return content.text
+    if hasattr(content, 'data'):
+        return content.data
+    return None
+
+# slim_schemas 시 남기는 JSON Schema 키 (제목/예시/기본값/출력 스키마 등은 제거)
+# $defs/$ref: pydantic 중첩 모델 참조, anyOf/oneOf/allOf: Optional 등 조합 타입
+SLIM_SCHEMA_KEYS = frozenset({
+    'type', 'description', 'properties', 'required', 'enum', 'items',
+    '$defs', '$ref', 'anyOf', 'oneOf', 'allOf'
+})
+
+def _slim_schema(schema: Any) -> Any:
+    """JSON Schema에서 SLIM_SCHEMA_KEYS만 남기기 (하위 스키마는 재귀)"""
+    if not isinstance(schema, dict):
+        return schema
+    slim = {}
+    for key, value in schema.items():
+        if key not in SLIM_SCHEMA_KEYS:
+            continue
+        if key in ('properties', '$defs') and isinstance(value, dict):
+            # 이름 → 스키마 매핑: 이름은 그대로 두고 값만 정리
+            value = {name: _slim_schema(sub) for name, sub in value.items()}
+        elif key in ('anyOf', 'oneOf', 'allOf') and isinstance(value, list):
+            value = [_slim_schema(sub) for sub in value]
+        elif key == 'items':
+            value = _slim_schema(value)
+        slim[key] = value
+    return slim
+
+# think_augment 시 툴 스키마에 추가되는 "호출 이유" 파라미터
+TOOLCALL_REASON_PARAM = 'toolcall_reason'
+_TOOLCALL_REASON_SCHEMA = {
+    'type': 'string',
+    'description': 'Briefly explain why this tool call is needed right now.'
+}
+
 class ToolRegistry:
     """
     MCP 툴 레지스트리
@@ -15,19 +82,54 @@ class ToolRegistry:
     SABA MCP Bridge에 SSE로 연결해서 툴 관리
     """
     
-    def __init__(self, mcp_bridge_url: str = "http://localhost:8083\sse"):
+    def __init__(
+        self,
+        mcp_bridge_url: str = "http://localhost:8083\sse",
+        result_cache_ttl: Optional[Dict[str, float]] = None,
+        result_cache_size: int = 256,
+        think_augment: bool = False,
+        slim_schemas: bool = False
+    ):
+        """
+        Args:
+            mcp_bridge_url: MCP Bridge 주소
+            result_cache_ttl: 결과를 캐시할 툴 → TTL(초). 같은 인자로 부르면
+                TTL 동안 MCP 호출 없이 이전 결과 반환 (조회성 툴 전용, 기본: 없음)
+            result_cache_size: 결과 캐시 최대 항목 수. 넘치면 가장 오래 안 쓴 것부터 제거 (LRU)
+            think_augment: True면 LLM에 보이는 툴 스키마에 toolcall_reason 파라미터를
+                추가해서 호출 이유를 쓰게 함 (MCP 호출 전에 제거됨)
+            slim_schemas: True면 툴 입력 스키마에서 type/description/enum 등
+                필수 키만 남겨 LLM 프롬프트 크기를 줄임 (기본: 원본 그대로)
+        """
         self.mcp_bridge_url = mcp_bridge_url
         self.sse_url = f"{mcp_bridge_url}/sse"  # SSE 엔드포인트
         self.tools: Dict[str, Callable] = {}
         self.tool_schemas: Dict[str, Dict] = {}
         self.session: ClientSession = None
         self.exit_stack = AsyncExitStack()
+        # 툴 이름 → (스키마 fingerprint, 툴 함수, 원본 스키마). 재로드 시 스키마가 같으면 재사용
+        self._tool_func_cache: Dict[str, Tuple[bytes, Callable, Dict[str, Any]]] = {}
+        self.result_cache_ttl: Dict[str, float] = result_cache_ttl or {}
+        self.think_augment = think_augment
+        self.slim_schemas = slim_schemas
+        # (툴 이름, 인자 JSON) → (만료 monotonic 시각, 결과)
+        # 인자가 매번 다른 호출(타임스탬프, id 등)로 무한히 커지지 않도록 LRU로 크기 제한
+        self.result_cache_size = result_cache_size
+        self._result_cache: "OrderedDict[Tuple[str, bytes], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # search_tools용 BM25 인덱스: 툴 이름 → (가중 term 빈도, 문서 길이)
+        self._search_docs: Dict[str, Tuple[Counter, int]] = {}
+        self._search_df: Counter = Counter()
+        self._search_avgdl = 0.0
+        # 툴 목록이 다시 로드될 때마다 증가 → reflex별 툴 선택 캐시 무효화
+        self._tools_version = 0
+        # reflex 툴 이름 tuple → (툴 목록 버전, 선택된 {이름: 함수})
+        self._selection_cache: Dict[Tuple[str, ...], Tuple[int, Dict[str, Callable]]] = {}
     
     async def connect(self):
         """MCP Bridge에 SSE로 연결"""
         try:
-            print(f"🔌 Connecting to MCP Bridge via SSE...")
-            print(f"   URL: {self.sse_url}")
+            logger.info("🔌 Connecting to MCP Bridge via SSE...")
+            logger.info("   URL: %s", self.sse_url)
             
             # SSE 클라이언트로 연결
             streams_context = sse_client(url=self.sse_url)
@@ -43,26 +145,26 @@ class ToolRegistry:
             # Initialize
             await self.session.initialize()
             
-            print(f"   ✅ Connected to MCP Bridge\n")
+            logger.info("   ✅ Connected to MCP Bridge")
             return True
             
         except Exception as e:
-            print(f"   ❌ Failed to connect: {e}\n")
+            logger.exception("   ❌ Failed to connect: %s", e)
             return False
     
     async def disconnect(self):
         """연결 종료"""
         await self.exit_stack.aclose()
-        print("🔌 Disconnected from MCP Bridge")
+        logger.info("🔌 Disconnected from MCP Bridge")
     
     async def load_tools_from_mcp(self):
         """
         MCP Bridge에서 사용 가능한 툴 목록 로드
         """
-        print("📦 Loading tools from MCP Bridge...")
+        logger.info("📦 Loading tools from MCP Bridge...")
         
         if not self.session:
-            print("   ⚠️ Not connected. Call connect() first.")
+            logger.warning("   ⚠️ Not connected. Call connect() first.")
             return
         
         try:
@@ -70,29 +172,40 @@ class ToolRegistry:
             tools_result = await self.session.list_tools()
             mcp_tools = tools_result.tools
             
-            print(f"   Found {len(mcp_tools)} tool(s) from MCP")
+            logger.info("   Found %d tool(s) from MCP", len(mcp_tools))
             
             # 각 툴 등록
             for tool in mcp_tools:
                 tool_name = tool.name
                 
-                print(f"      ✓ {tool_name}")
+                logger.debug("      ✓ %s", tool_name)
                 
-                # 툴 함수 생성
-                tool_func = self._create_tool_function(tool_name, tool)
+                # 툴 함수 생성 (스키마가 바뀌지 않았으면 이전 함수 재사용)
+                fingerprint = _fingerprint([tool.description, getattr(tool, 'inputSchema', None)])
+                cached = self._tool_func_cache.get(tool_name)
+                if cached and cached[0] == fingerprint:
+                    _, tool_func, schema = cached
+                else:
+                    tool_func = self._create_tool_function(tool_name, tool)
+                    # tool_schemas에는 MCP 원본 inputSchema를 보관
+                    # (LLM에 보내는 slim/toolcall_reason 적용본은 tool_func._mcp_schema)
+                    schema = {
+                        'name': tool.name,
+                        'description': tool.description,
+                        'parameters': tool.inputSchema if hasattr(tool, 'inputSchema') else {}
+                    }
+                    self._tool_func_cache[tool_name] = (fingerprint, tool_func, schema)
                 
                 # 등록
                 self.tools[tool_name] = tool_func
-                self.tool_schemas[tool_name] = {
-                    'name': tool.name,
-                    'description': tool.description,
-                    'parameters': tool.inputSchema if hasattr(tool, 'inputSchema') else {}
-                }
+                self.tool_schemas[tool_name] = schema
             
-            print(f"\n✅ Loaded {len(self.tools)} tool(s) total\n")
+            self._build_search_index()
+            self._tools_version += 1
+            logger.info("✅ Loaded %d tool(s) total", len(self.tools))
             
         except Exception as e:
-            print(f"   ❌ Error loading tools: {e}\n")
+            logger.exception("   ❌ Error loading tools: %s", e)
             raise
     
     def _create_tool_function(self, tool_name: str, tool_info: Any) -> Callable:
@@ -101,13 +214,44 @@ class ToolRegistry:
         
         이 함수가 실제로 MCP Session을 통해 툴을 호출함
         """
+        parameters = tool_info.inputSchema if hasattr(tool_info, 'inputSchema') else {}
+        if self.slim_schemas:
+            parameters = _slim_schema(parameters)
+        
+        # 툴 자체에 같은 이름 파라미터가 있으면 건드리지 않음
+        augmented = (
+            self.think_augment
+            and TOOLCALL_REASON_PARAM not in (parameters or {}).get('properties', {})
+        )
+        if augmented:
+            parameters = dict(parameters or {'type': 'object'})
+            parameters['properties'] = {
+                **parameters.get('properties', {}),
+                TOOLCALL_REASON_PARAM: _TOOLCALL_REASON_SCHEMA
+            }
+            parameters['required'] = [*parameters.get('required', []), TOOLCALL_REASON_PARAM]
+        
         async def tool_func(**kwargs):
             """Call MCP tool via SSE session"""
             if not self.session:
-                return {
-                    'success': False,
-                    'error': 'Not connected to MCP Bridge'
-                }
+                return dict(_ERR_NOT_CONNECTED)
+            
+            if augmented:
+                reason = kwargs.pop(TOOLCALL_REASON_PARAM, None)
+                if reason:
+                    logger.info("      💭 %s reason: %s", tool_name, reason)
+            
+            # 캐시 대상 툴이면 같은 인자의 최근 결과 재사용
+            ttl = self.result_cache_ttl.get(tool_name)
+            if ttl:
+                cache_key = (tool_name, _fingerprint(kwargs))
+                cached = self._result_cache.get(cache_key)
+                if cached:
+                    if cached[0] > time.monotonic():
+                        self._result_cache.move_to_end(cache_key)
+                        # 호출자가 결과를 수정해도 캐시 항목은 그대로 유지되도록 복사본 반환
+                        return copy.deepcopy(cached[1])
+                    del self._result_cache[cache_key]
             
             try:
                 # MCP Session으로 tool 호출
@@ -120,18 +264,19 @@ class ToolRegistry:
                         'error': str(result.content)
                     }
                 
-                # 성공 시 content 반환
-                content_list = []
-                for content in result.content:
-                    if hasattr(content, 'text'):
-                        content_list.append(content.text)
-                    elif hasattr(content, 'data'):
-                        content_list.append(content.data)
+                # 성공 시 content 반환 (대부분 단일 content → 리스트 없이 바로 꺼냄)
+                contents = result.content
+                if len(contents) == 1:
+                    value = _content_value(contents[0])
+                    payload = [] if value is None else value
+                else:
+                    content_list = [v for v in map(_content_value, contents) if v is not None]
+                    payload = content_list[0] if len(content_list) == 1 else content_list
                 
-                return {
-                    'success': True,
-                    'result': content_list[0] if len(content_list) == 1 else content_list
-                }
+                response = {'success': True, 'result': payload}
+                if ttl:
+                    self._store_result(cache_key, ttl, response)
+                return response
                 
             except Exception as e:
                 return {
@@ -146,11 +291,20 @@ class ToolRegistry:
         tool_func._mcp_schema = {
             'name': tool_info.name,
             'description': tool_info.description,
-            'parameters': tool_info.inputSchema if hasattr(tool_info, 'inputSchema') else {}
+            'parameters': parameters
         }
         
         return tool_func
     
+    def _store_result(self, cache_key: Tuple[str, bytes], ttl: float, response: Dict[str, Any]):
+        """툴 결과를 캐시에 저장 (최대 크기를 넘으면 가장 오래 안 쓴 항목부터 제거)"""
+        cache = self._result_cache
+        # 첫 호출자에게 돌려주는 response와 분리된 사본을 보관
+        cache[cache_key] = (time.monotonic() + ttl, copy.deepcopy(response))
+        cache.move_to_end(cache_key)
+        while len(cache) > self.result_cache_size:
+            cache.popitem(last=False)
+    
     def get_tools_for_reflex(self, tool_names: List[str]) -> Dict[str, Callable]:
         """
         Reflex가 사용할 툴들만 반환
@@ -161,15 +315,76 @@ class ToolRegistry:
         Returns:
             {tool_name: tool_function, ...}
         """
+        # 발화마다 같은 이름 목록으로 불리므로 툴 목록이 바뀌지 않았으면 이전 결과 반환
+        key = tuple(tool_names)
+        cached = self._selection_cache.get(key)
+        if cached and cached[0] == self._tools_version:
+            return dict(cached[1])
+        
         selected = {}
         
         for name in tool_names:
             if name in self.tools:
                 selected[name] = self.tools[name]
             else:
-                print(f"      ⚠️ Tool '{name}' not found in registry")
+                logger.warning("      ⚠️ Tool '%s' not found in registry", name)
+                suggestions = self.search_tools(name, limit=3)
+                if suggestions:
+                    logger.warning("         Did you mean: %s", suggestions)
+        
+        self._selection_cache[key] = (self._tools_version, selected)
+        return dict(selected)
+    
+    def _build_search_index(self):
+        """툴 이름(x3)/설명/파라미터 이름으로 BM25 인덱스 구성"""
+        docs = {}
+        for tool_name, schema in self.tool_schemas.items():
+            tf = Counter()
+            for tok in _tokenize(tool_name):
+                tf[tok] += 3
+            tf.update(_tokenize(schema.get('description')))
+            for param in (schema.get('parameters') or {}).get('properties', {}):
+                tf.update(_tokenize(param))
+            docs[tool_name] = (tf, sum(tf.values()))
+        
+        self._search_docs = docs
+        self._search_df = Counter(tok for tf, _ in docs.values() for tok in tf)
+        self._search_avgdl = (
+            sum(dl for _, dl in docs.values()) / len(docs) if docs else 0.0
+        )
+    
+    def search_tools(self, query: str, limit: int = 5) -> List[str]:
+        """
+        이름/설명으로 툴 검색 (BM25, 점수 높은 순)
+        
+        Args:
+            query: 'motor speed', 'camera' 등 자유 텍스트
+            limit: 최대 반환 개수
+        
+        Returns:
+            [tool_name, ...]
+        """
+        terms = _tokenize(query)
+        if not terms or not self._search_docs:
+            return []
+        
+        k1, b = 1.2, 0.75
+        n = len(self._search_docs)
+        scored = []
+        for tool_name, (tf, dl) in self._search_docs.items():
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if not freq:
+                    continue
+                df = self._search_df[term]
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                score += idf * freq * (k1 + 1) / (freq + k1 * (1 - b + b * dl / self._search_avgdl))
+            if score > 0:
+                scored.append((score, tool_name))
         
-        return selected
+        scored.sort(reverse=True)
+        return [tool_name for _, tool_name in scored[:limit]]
     
     def list_tools(self) -> List[str]:
         """사용 가능한 툴 목록"""
@@ -1,8 +1,7 @@
 # reflex/triggers/base.py
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import importlib
-import inspect
 from pathlib import Path
 
 class TriggerBase(ABC):
@@ -26,6 +25,27 @@ class TriggerBase(ABC):
     def to_dict(self) -> Dict[str, Any]:
         pass
     
+    def next_fire_time(self) -> Optional[float]:
+        """
+        다음 발화 예정 시각 (epoch 초)
+        
+        엔진은 이 시각까지 잠들었다가 깨어남.
+        None이면 예측 불가 → 엔진이 매 tick마다 check() 호출
+        """
+        return None
+    
+    def __init_subclass__(cls, trigger_type: Optional[str] = None, **kwargs):
+        """
+        클래스 정의 시점에 Trigger 자동 등록
+        
+        Usage:
+            class ScheduleTrigger(TriggerBase, trigger_type='schedule'):
+                ...
+        """
+        super().__init_subclass__(**kwargs)
+        if trigger_type:
+            TriggerBase._registry[trigger_type] = cls
+    
     @classmethod
     def register(cls, trigger_type: str):
         """
@@ -52,22 +72,28 @@ class TriggerBase(ABC):
             raise ValueError("Trigger data must have 'type' field")
         
         # Registry에서 찾기
-        if trigger_type in cls._registry:
-            trigger_class = cls._registry[trigger_type]
+        trigger_class = cls._registry.get(trigger_type)
+        if trigger_class is not None:
             return trigger_class(data)
         
         # Registry에 없으면 동적 로드 시도
         try:
             module = importlib.import_module(f'.{trigger_type}', package='reflex.triggers')
+        except ImportError:
+            module = None
+        
+        if module is not None:
+            # import 시 클래스 정의(또는 @register)로 등록됐으면 바로 사용
+            trigger_class = cls._registry.get(trigger_type)
+            if trigger_class is not None:
+                return trigger_class(data)
             
-            # 모듈에서 TriggerBase 상속한 클래스 찾기
-            for name, obj in inspect.getmembers(module, inspect.isclass):
-                if issubclass(obj, cls) and obj is not cls:
+            # 데코레이터 없는 모듈: 모듈에서 TriggerBase 상속한 클래스 찾기
+            for obj in vars(module).values():
+                if isinstance(obj, type) and obj is not cls and issubclass(obj, cls):
                     # 자동 등록
                     cls._registry[trigger_type] = obj
                     return obj(data)
-        except ImportError:
-            pass
         
         raise ValueError(f"Unknown trigger type: {trigger_type}")
     
@@ -1,11 +1,11 @@
 # reflex/triggers/schedule.py
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
+import time
 from croniter import croniter
 from .base import TriggerBase
 
-@TriggerBase.register('schedule')  # ← 자동 등록!
-class ScheduleTrigger(TriggerBase):
+class ScheduleTrigger(TriggerBase, trigger_type='schedule'):  # ← 자동 등록!
     """시간 기반 Trigger"""
     
     def __init__(self, config: Dict[str, Any]):
@@ -18,21 +18,46 @@ class ScheduleTrigger(TriggerBase):
         try:
             self.cron_iter = croniter(self.cron, datetime.now())
             self.next_run = self.cron_iter.get_next(datetime)
+            self._next_run_ts = self.next_run.timestamp()
         except Exception as e:
             raise ValueError(f"Invalid cron expression '{self.cron}': {e}")
+        
+        # True면 다음 cron 시각을 기다리지 않고 엔진 첫 tick에 한 번 발화
+        self.fire_on_start = bool(config.get('fire_on_start', False))
+        self._fire_pending = self.fire_on_start
     
     async def check(self, event: Dict[str, Any], state: Dict[str, Any]) -> bool:
-        now = datetime.now()
-        
-        if now >= self.next_run:
-            self.cron_iter = croniter(self.cron, now)
-            self.next_run = self.cron_iter.get_next(datetime)
+        # 시작 직후 1회 발화 (cron 일정은 그대로 유지)
+        if self._fire_pending:
+            self._fire_pending = False
             return True
         
-        return False
+        # 대부분의 호출은 발화 전이므로 float 비교만 하고 datetime은 발화 시에만 생성
+        now_ts = time.time()
+        if now_ts < self._next_run_ts:
+            return False
+        
+        # 기존 iterator를 이어서 사용 (cron 문자열 재파싱 없음)
+        self.next_run = self.cron_iter.get_next(datetime)
+        self._next_run_ts = self.next_run.timestamp()
+        
+        # 여러 회차가 밀렸으면 (엔진 정지/절전 등) 현재 시각 기준으로 다시 맞춤
+        if self._next_run_ts <= now_ts:
+            self.cron_iter = croniter(self.cron, datetime.now())
+            self.next_run = self.cron_iter.get_next(datetime)
+            self._next_run_ts = self.next_run.timestamp()
+        return True
+    
+    def next_fire_time(self) -> Optional[float]:
+        if self._fire_pending:
+            return time.time()
+        return self._next_run_ts
     
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        data = {
             'type': 'schedule',
             'cron': self.cron
-        }
\ No newline at end of file
+        }
+        if self.fire_on_start:
+            data['fire_on_start'] = True
+        return data
\ No newline at end of file
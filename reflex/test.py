@@ -1,5 +1,6 @@
 # main.py - 채팅 템플릿 방식
 import asyncio
+import logging
 import os
 from reflex.core.engine import ReflexEngine
 from reflex.core.state import WorldState
@@ -10,12 +11,12 @@ from reflex.actions.llm import LLMAction
 from reflex.tools.registry import ToolRegistry
 
 async def main():
-    print("=" * 60)
-    print("🌟 SABA Reflex MVP")
-    print("=" * 60)
-    print()
+    rule = "=" * 60
+    print(f"{rule}\n🌟 SABA Reflex MVP\n{rule}\n")
     
-    if not os.environ.get('ANTHROPIC_API_KEY'):
+    # 키는 한 번만 읽어서 각 LLMAction에 넘김
+    api_key = os.environ.get('ANTHROPIC_API_KEY')
+    if not api_key:
         print("❌ ANTHROPIC_API_KEY not set!")
         return
     
@@ -32,10 +33,11 @@ async def main():
     simple_reflex = Reflex(
         id="simple_test",
         name="Simple Test",
-        trigger=ScheduleTrigger({'type': 'schedule', 'cron': '* * * * *'}),
+        trigger=ScheduleTrigger({'type': 'schedule', 'cron': '* * * * *', 'fire_on_start': True}),
         action=LLMAction({
             'type': 'llm',
             'model': 'claude-haiku-4-5-20251001',
+            'api_key': api_key,
             'messages': [
         {'role': 'user', 'content': '작업 수행해줘.'}
     ]
@@ -53,4 +55,18 @@ async def main():
         print("\n⚠️ Shutting down...")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # ToolRegistry 등은 logging으로 출력 (DEBUG로 바꾸면 툴 목록까지 표시)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # SSE 요청 로그는 숨김
+
+    # uvloop이 설치되어 있으면 더 빠른 이벤트 루프 사용 (Linux/macOS, 선택 사항)
+    # 프로파일링/디버깅 시에는 REFLEX_EVENT_LOOP=asyncio 로 기본 루프 강제
+    if os.environ.get("REFLEX_EVENT_LOOP", "uvloop").lower() != "asyncio":
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
+
+    # PYTHONASYNCIODEBUG가 켜져 있어도 debug 모드(콜백마다 시간 측정)로 돌지 않도록 명시
+    asyncio.run(main(), debug=False)
\ No newline at end of file
@@ -0,0 +1,53 @@
+# tests/test_registry.py
+from reflex.tools.registry import _slim_schema
+
+
+# bridge의 projected tool이 내보내는 형태 (pydantic 중첩 모델 → $defs/$ref)
+BRIDGE_SCHEMA = {
+    '$defs': {
+        'MotorParams': {
+            'title': 'MotorParams',
+            'type': 'object',
+            'properties': {
+                'speed': {'title': 'Speed', 'type': 'integer', 'description': 'PWM duty'},
+                'direction': {
+                    'title': 'Direction',
+                    'anyOf': [{'type': 'string', 'enum': ['cw', 'ccw']}, {'type': 'null'}],
+                    'default': None,
+                },
+            },
+            'required': ['speed'],
+        }
+    },
+    'title': 'MotorArguments',
+    'type': 'object',
+    'properties': {
+        'params': {'$ref': '#/$defs/MotorParams'},
+    },
+    'required': ['params'],
+}
+
+
+def test_slim_schema_keeps_nested_model_refs():
+    slim = _slim_schema(BRIDGE_SCHEMA)
+
+    assert slim['properties']['params'] == {'$ref': '#/$defs/MotorParams'}
+    params = slim['$defs']['MotorParams']
+    assert params['properties']['speed'] == {'type': 'integer', 'description': 'PWM duty'}
+    assert params['required'] == ['speed']
+    assert 'title' not in slim and 'title' not in params
+
+
+def test_slim_schema_recurses_into_any_of():
+    slim = _slim_schema(BRIDGE_SCHEMA)
+
+    direction = slim['$defs']['MotorParams']['properties']['direction']
+    assert direction == {
+        'anyOf': [{'type': 'string', 'enum': ['cw', 'ccw']}, {'type': 'null'}]
+    }
+
+
+def test_slim_schema_keeps_property_named_like_dropped_key():
+    schema = {'type': 'object', 'properties': {'title': {'type': 'string', 'title': 'Title'}}}
+
+    assert _slim_schema(schema) == {'type': 'object', 'properties': {'title': {'type': 'string'}}}